@@ -14,6 +14,8 @@
 
 """Modules parameterizing PDEs describing atmospheric processes."""
 
+import dataclasses
+import functools
 from typing import Callable, Sequence
 
 from dinosaur import coordinate_systems
@@ -22,7 +24,6 @@ from dinosaur import sigma_coordinates
 import jax.numpy as jnp
 from neuralgcm.experimental.core import coordinates
 from neuralgcm.experimental.core import orographies
-from neuralgcm.experimental.core import pytree_utils
 from neuralgcm.experimental.core import spherical_transforms
 from neuralgcm.experimental.core import time_integrators
 from neuralgcm.experimental.core import typing
@@ -51,20 +52,26 @@ class PrimitiveEquations(time_integrators.ImplicitExplicitODE):
     self.orography_module = orography_module
     self.sim_units = sim_units
     self.orography = orography_module
-    self.reference_temperatures = reference_temperatures
+    # Stored as python floats so that reference temperatures remain static
+    # metadata rather than becoming traced module state under nnx transforms.
+    self.reference_temperatures = tuple(
+        float(t) for t in reference_temperatures
+    )
     self.vertical_advection = vertical_advection
     self.include_vertical_advection = include_vertical_advection
     self.equation_cls = equation_cls
+    # Coordinates do not depend on module state, so we build them only once.
+    self._dinosaur_coords = coordinate_systems.CoordinateSystem(
+        horizontal=ylm_transform.dinosaur_grid,
+        vertical=sigma_levels.sigma_levels,
+        spmd_mesh=ylm_transform.dinosaur_spmd_mesh,
+    )
 
   @property
   def primitive_equation(self):
-    dinosaur_coords = coordinate_systems.CoordinateSystem(
-        horizontal=self.ylm_transform.dinosaur_grid,
-        vertical=self.sigma_levels.sigma_levels,
-        spmd_mesh=self.ylm_transform.dinosaur_spmd_mesh,
-    )
+    # Not cached: orography is a module variable that can be updated or learned.
     return self.equation_cls(
-        coords=dinosaur_coords,
+        coords=self._dinosaur_coords,
         physics_specs=self.sim_units,
         reference_temperature=np.asarray(self.reference_temperatures),
         orography=self.orography_module.modal_orography,
@@ -74,49 +81,73 @@ class PrimitiveEquations(time_integrators.ImplicitExplicitODE):
 
   @property
   def T_ref(self) -> typing.Array:
-    return self.primitive_equation.T_ref
+    """Returns reference temperatures with spatial dimensions appended."""
+    return np.asarray(self.reference_temperatures)[:, np.newaxis, np.newaxis]
+
+  def _map_log_surface_pressure(
+      self,
+      fn: Callable[[typing.Array], typing.Array],
+      state: primitive_equations.StateWithTime,
+  ) -> primitive_equations.StateWithTime:
+    """Returns `state` with `fn` applied to the log_surface_pressure field."""
+    return dataclasses.replace(
+        state, log_surface_pressure=fn(state.log_surface_pressure)
+    )
 
   def _expand_log_surface_pressure(
       self, state: primitive_equations.StateWithTime
   ) -> primitive_equations.StateWithTime:
-    state_as_dict, from_dict_fn = pytree_utils.as_dict(state)
-    state_as_dict['log_surface_pressure'] = jnp.expand_dims(
-        state_as_dict['log_surface_pressure'], axis=0
+    return self._map_log_surface_pressure(
+        functools.partial(jnp.expand_dims, axis=0), state
     )
-    return from_dict_fn(state_as_dict)
 
   def _squeeze_log_surface_pressure(
       self, state: primitive_equations.StateWithTime
   ) -> primitive_equations.StateWithTime:
-    state_as_dict, from_dict_fn = pytree_utils.as_dict(state)
-    state_as_dict['log_surface_pressure'] = jnp.squeeze(
-        state_as_dict['log_surface_pressure'], axis=0
+    return self._map_log_surface_pressure(
+        functools.partial(jnp.squeeze, axis=0), state
     )
-    return from_dict_fn(state_as_dict)
+
+  def _apply_with_expanded_log_surface_pressure(
+      self,
+      fn: Callable[..., primitive_equations.StateWithTime],
+      state: primitive_equations.StateWithTime,
+      *args,
+  ) -> primitive_equations.StateWithTime:
+    """Applies `fn` to `state` with a leading log_surface_pressure axis."""
+    outputs = fn(self._expand_log_surface_pressure(state), *args)
+    return self._squeeze_log_surface_pressure(outputs)
 
   def explicit_terms(
       self, state: primitive_equations.StateWithTime
   ) -> primitive_equations.StateWithTime:
-    return self._squeeze_log_surface_pressure(
-        self.primitive_equation.explicit_terms(
-            self._expand_log_surface_pressure(state)
-        )
+    return self._apply_with_expanded_log_surface_pressure(
+        self.primitive_equation.explicit_terms, state
     )
 
   def implicit_terms(
       self, state: primitive_equations.StateWithTime
   ) -> primitive_equations.StateWithTime:
-    return self._squeeze_log_surface_pressure(
-        self.primitive_equation.implicit_terms(
-            self._expand_log_surface_pressure(state)
-        )
+    return self._apply_with_expanded_log_surface_pressure(
+        self.primitive_equation.implicit_terms, state
     )
 
   def implicit_inverse(
       self, state: primitive_equations.StateWithTime, step_size: float
   ) -> primitive_equations.StateWithTime:
-    return self._squeeze_log_surface_pressure(
-        self.primitive_equation.implicit_inverse(
-            self._expand_log_surface_pressure(state), step_size
-        )
+    """Applies `(1 - step_size * implicit_terms)⁻¹` to `state`.
+
+    `step_size` must be a concrete python float rather than a traced value.
+    The implicit matrix is assembled and inverted in numpy for each step size,
+    so every distinct value is traced into the computation as a constant.
+
+    Args:
+      state: state to which the inverse is applied.
+      step_size: value that depends on the choice of time integration method.
+
+    Returns:
+      The result of applying `(1 - step_size * implicit_terms)⁻¹` to `state`.
+    """
+    return self._apply_with_expanded_log_surface_pressure(
+        self.primitive_equation.implicit_inverse, state, step_size
     )
@@ -0,0 +1,111 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for atmospheric equation modules."""
+
+from absl.testing import absltest
+from absl.testing import parameterized
+import chex
+from dinosaur import primitive_equations
+from flax import nnx
+import jax
+from neuralgcm.experimental.atmosphere import equations
+from neuralgcm.experimental.core import coordinates
+from neuralgcm.experimental.core import orographies
+from neuralgcm.experimental.core import parallelism
+from neuralgcm.experimental.core import spherical_transforms
+from neuralgcm.experimental.core import units
+import numpy as np
+
+
+class PrimitiveEquationsTest(parameterized.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    n_sigma = 4
+    ylm_transform = spherical_transforms.SphericalHarmonicsTransform(
+        lon_lat_grid=coordinates.LonLatGrid.T21(),
+        ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
+        partition_schema_key=None,
+        mesh=parallelism.Mesh(),
+    )
+    sigma_levels = coordinates.SigmaLevels.equidistant(n_sigma)
+    self.primitive_equations = equations.PrimitiveEquations(
+        ylm_transform=ylm_transform,
+        sigma_levels=sigma_levels,
+        sim_units=units.DEFAULT_UNITS,
+        reference_temperatures=np.linspace(220, 250, num=n_sigma),
+        orography_module=orographies.ModalOrography(
+            ylm_transform=ylm_transform,
+            rngs=nnx.Rngs(0),
+        ),
+    )
+    rng = np.random.default_rng(0)
+    volume_shape = sigma_levels.shape + ylm_transform.modal_grid.shape
+    volume = lambda: 1e-3 * rng.normal(size=volume_shape)
+    self.state = primitive_equations.StateWithTime(
+        vorticity=volume(),
+        divergence=volume(),
+        temperature_variation=volume(),
+        log_surface_pressure=1e-3 * rng.normal(
+            size=ylm_transform.modal_grid.shape
+        ),
+        tracers={
+            'specific_humidity': volume(),
+            'specific_cloud_ice_water_content': volume(),
+            'specific_cloud_liquid_water_content': volume(),
+        },
+        sim_time=np.zeros(()),
+    )
+
+  def _assert_shapes_match_state(self, outputs):
+    # tendencies of sim_time may be returned as python scalars.
+    self.assertEqual(
+        jax.tree.map(np.shape, outputs), jax.tree.map(np.shape, self.state)
+    )
+
+  def test_t_ref_matches_dinosaur(self):
+    np.testing.assert_allclose(
+        self.primitive_equations.T_ref,
+        self.primitive_equations.primitive_equation.T_ref,
+    )
+
+  @parameterized.named_parameters(
+      dict(testcase_name='explicit_terms', method='explicit_terms', args=()),
+      dict(testcase_name='implicit_terms', method='implicit_terms', args=()),
+      dict(
+          testcase_name='implicit_inverse',
+          method='implicit_inverse',
+          args=(0.01,),
+      ),
+  )
+  def test_terms_eager_and_under_jit(self, method: str, args: tuple[float]):
+    fn = lambda module, state: getattr(module, method)(state, *args)
+    eager = fn(self.primitive_equations, self.state)
+    jitted = nnx.jit(fn)(self.primitive_equations, self.state)
+    self._assert_shapes_match_state(eager)
+    chex.assert_tree_all_finite(eager)
+    chex.assert_trees_all_close(jitted, eager, rtol=1e-5, atol=1e-6)
+
+  def test_implicit_inverse_of_explicit_terms_under_jit(self):
+    # reference temperatures must remain static under nnx transforms.
+    step = nnx.jit(lambda m, s: m.implicit_inverse(m.explicit_terms(s), 0.01))
+    outputs = step(self.primitive_equations, self.state)
+    self._assert_shapes_match_state(outputs)
+    chex.assert_tree_all_finite(outputs)
+
+
+if __name__ == '__main__':
+  jax.config.parse_flags_with_absl()
+  absltest.main()
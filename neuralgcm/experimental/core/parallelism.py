@@ -15,6 +15,7 @@
 
 import collections
 import dataclasses
+import functools
 import math
 from typing import Self, Type, TypeGuard
 
@@ -320,10 +321,17 @@ class Mesh:
     Returns:
       `inputs` with sharding constraint(s) applied.
     """
-    p_specs = P(*self.array_partitions[schema])
-    sharding = jax.sharding.NamedSharding(self.spmd_mesh, p_specs)
+    sharding = self._array_shardings[schema]
     return jax.lax.with_sharding_constraint(array, sharding)
 
+  @functools.cached_property
+  def _array_shardings(self) -> dict[Schema, jax.sharding.NamedSharding]:
+    """NamedSharding for each schema in `self.array_partitions`."""
+    return {
+        schema: jax.sharding.NamedSharding(self.spmd_mesh, P(*partition))
+        for schema, partition in self.array_partitions.items()
+    }
+
   def _get_named_sharding(
       self, dims: tuple[str, ...], schema: str
   ) -> jax.sharding.NamedSharding:
@@ -103,11 +103,8 @@ def unstack_to_pytree(
     array: typing.Array, pytree_of_shapes: typing.Pytree, axis: int = 0
 ) -> typing.Pytree:
   """Unstacks an `array` into a pytree with shapes `pytree_of_shapes`."""
-  _, tree_def = jax.tree.flatten(pytree_of_shapes)
-  # `array` is split along `axis` and resulting singleton dimension is removed
-  split = jnp.split(array, array.shape[axis], axis)
-  split = jax.tree.map(lambda x: jnp.squeeze(x, axis=axis), split)
-  return jax.tree.unflatten(tree_def, split)
+  tree_def = jax.tree.structure(pytree_of_shapes)
+  return jax.tree.unflatten(tree_def, jnp.unstack(array, axis=axis))
 
 
 def tree_map_where(
@@ -14,6 +14,7 @@
 
 """Modules that define learnable mappings between input/output pytrees."""
 
+import functools
 from typing import Callable, Protocol, Sequence
 
 from flax import nnx
@@ -77,7 +78,19 @@ class ChannelMapping(nnx.Module):
     output_size = sum([x.shape[f_axis] for x in jax.tree.leaves(out_shapes)])
     # tower preserves the last two spatial dimensions.
     self.tower = tower_factory(input_size, output_size, rngs=rngs)
+    # validate tower output rank once here rather than on every call.
+    packed_shape = jax.eval_shape(
+        functools.partial(pytree_utils.pack_pytree, axis=f_axis), in_shapes
+    )
+    tower_out_shape = nnx.eval_shape(
+        lambda tower, x: tower(x), self.tower, packed_shape
+    )
+    if tower_out_shape.ndim != 3:
+      raise ValueError(
+          f'Expected tower outputs with ndim=3, got {tower_out_shape.shape=}'
+      )
     self._output_shapes = output_shapes
+    self._expanded_output_shapes = out_shapes
     self.feature_axis = f_axis
 
   def __call__(self, inputs: typing.Pytree) -> typing.Pytree:
@@ -87,13 +100,8 @@ class ChannelMapping(nnx.Module):
     if array.ndim != 3:
       raise ValueError(f'Expected input array with ndim=3, got {array.shape=}')
     outputs = self.tower(array)
-    if outputs.ndim != 3:
-      raise ValueError(f'Expected outputs with ndim=3, got {outputs.shape=}')
-    out_shapes = pytree_utils.expand_to_ndim(
-        self._output_shapes, ndim=3, axis=self.feature_axis
-    )
     expanded_outputs = pytree_utils.unpack_to_pytree(
-        outputs, out_shapes, self.feature_axis
+        outputs, self._expanded_output_shapes, self.feature_axis
     )
     return pytree_utils.squeeze_to_shapes(
         expanded_outputs, self._output_shapes, self.feature_axis
@@ -136,6 +144,18 @@ class VariableMapping(nnx.Module):
 
     # tower preserves the last two spatial dimensions.
     self.tower = tower_factory(input_size, output_size, rngs=rngs)
+    # validate tower output rank once here rather than on every call.
+    stacked_shape = jax.eval_shape(
+        functools.partial(pytree_utils.stack_pytree, axis=feature_axis),
+        input_shapes,
+    )
+    tower_out_shape = nnx.eval_shape(
+        lambda tower, x: tower(x), self.tower, stacked_shape
+    )
+    if tower_out_shape.ndim != 4:
+      raise ValueError(
+          f'Expected tower outputs with ndim=4, got {tower_out_shape.shape=}'
+      )
     self._output_shapes = output_shapes
     self.feature_axis = feature_axis
 
@@ -144,8 +164,6 @@ class VariableMapping(nnx.Module):
     if array.ndim != 4:
       raise ValueError(f'Expected input array with ndim=4, got {array.shape=}')
     outputs = self.tower(array)
-    if outputs.ndim != 4:
-      raise ValueError(f'Expected outputs with ndim=4, got {outputs.shape=}')
     return pytree_utils.unstack_to_pytree(
         outputs, self._output_shapes, axis=self.feature_axis
     )
@@ -172,6 +190,8 @@ class MappingWithNormalizedInputs(nnx.Module):
     in_shapes = pytree_utils.expand_to_ndim(
         input_shapes, ndim=3, axis=-3
     )
+    # inputs with ndim=2 lack the leading feature axis and get expanded.
+    self._input_ndims = jax.tree.map(lambda x: x.ndim, input_shapes)
     self.normalization = normalization_factory(in_shapes, rngs=rngs)
     self.clip = clip_factory()
     self.mapping = mapping_factory(
@@ -188,7 +208,14 @@ class MappingWithNormalizedInputs(nnx.Module):
     return self.normalization(inputs)
 
   def __call__(self, inputs: typing.Pytree) -> typing.Pytree:
-    expanded_inputs = pytree_utils.expand_to_ndim(inputs, ndim=3, axis=-3)
+    def expand(x, ndim):
+      if x.ndim != ndim:
+        raise ValueError(
+            f'Expected input with ndim={ndim} from input_shapes, got {x.shape=}'
+        )
+      return jnp.expand_dims(x, -3) if ndim == 2 else x
+
+    expanded_inputs = jax.tree.map(expand, inputs, self._input_ndims)
     return self.mapping(self.clip(self.normalize(expanded_inputs)))
 
 
@@ -203,8 +230,11 @@ class ParallelMapping(nnx.Module):
     self.mappings = mappings
 
   def __call__(self, inputs: typing.Pytree) -> typing.Pytree:
-    results = [mapping(inputs) for mapping in self.mappings]
-    return jax.tree.map(lambda *args: sum(args), *results)
+    first, *rest = self.mappings
+    outputs = first(inputs)
+    for mapping in rest:
+      outputs = jax.tree.map(jnp.add, outputs, mapping(inputs))
+    return outputs
 
   @property
   def output_shapes(self):
@@ -212,7 +242,13 @@ class ParallelMapping(nnx.Module):
 
 
 class Embedding(nnx.Module):
-  """Generates floating-value embeddings from inputs using a pytree mapping."""
+  """Generates floating-value embeddings from inputs using a pytree mapping.
+
+  Inputs, features and outputs are annotated with dycore/physics sharding
+  constraints. The module is not jitted on its own; when called as part of a
+  jitted model step these constraints are compiled together with the feature
+  and mapping computations, letting the SPMD partitioner schedule resharding.
+  """
 
   def __init__(
       self,
@@ -263,23 +299,35 @@ class MaskedEmbedding(Embedding):
   """Embeddings + mask to remove nans (has 2 inputs so not a PytreeMapping)."""
 
   def __call__(self, inputs: typing.Pytree, mask: jnp.ndarray | None = None):
-    features = self._get_sharded_features(inputs)
+    features = self.compute_features(inputs)
+    return self.apply_to_features(features, mask)
+
+  def compute_features(self, inputs: typing.Pytree) -> typing.Pytree:
+    """Returns sharded features computed from `inputs`."""
+    return self._get_sharded_features(inputs)
 
+  def apply_to_features(
+      self, features: typing.Pytree, mask: jnp.ndarray | None = None
+  ) -> typing.Pytree:
+    """Returns embeddings computed from already sharded `features`."""
     if mask is not None:
-      def apply_mask(feature_leaf):
-        if feature_leaf.shape == mask.shape:
-          return jnp.where(
-              mask == 1, jnp.nan_to_num(feature_leaf, nan=0.0), feature_leaf
-          )
-        else:
-          return feature_leaf
-      features = jax.tree.map(apply_mask, features)
+      is_masked = mask == 1
+      features = pytree_utils.tree_map_where(
+          lambda x: x.shape == is_masked.shape,
+          lambda x: jnp.where(is_masked, jnp.nan_to_num(x, nan=0.0), x),
+          lambda x: x,
+          features,
+      )
     outputs = self._process_sharded_features(features)
     return outputs
 
 
 class LandSeaIceEmbedding(nnx.Module):
-  """Embedding module that combines embeddings over land, sea and sea ice."""
+  """Embedding module that combines embeddings over land, sea and sea ice.
+
+  Sub-embeddings of the same class that share a feature module and mesh
+  evaluate their features only once per call.
+  """
 
   def __init__(
       self,
@@ -307,24 +355,41 @@ class LandSeaIceEmbedding(nnx.Module):
     self.transform = transform
     self._output_shapes = output_shapes
 
+  def surface_fractions(
+      self, inputs: typing.Pytree
+  ) -> tuple[typing.Array, typing.Array, typing.Array]:
+    """Returns land mask, land fraction and sea ice fraction for `inputs`.
+
+    Locations where sea_ice_cover is NaN are treated as land.
+    """
+    # Here we assume NaNs in sea_ice_cover are the superset those in SST.
+    sea_ice_fraction = self.sea_ice_features(inputs)['sea_ice_cover']
+    land_mask = jnp.isnan(sea_ice_fraction)
+    land_sea_mask = self.land_sea_mask_features(inputs)['land_sea_mask']
+    land_fraction = jnp.where(land_mask, 1.0, land_sea_mask)
+    return land_mask, land_fraction, sea_ice_fraction
+
   def __call__(
       self,
       inputs: typing.Pytree,
   ) -> typing.Pytree:
     """Returns the embedding output on nodal locations."""
+    land_mask, land_fraction, sea_ice_fraction = self.surface_fractions(inputs)
+
     # get outputs from each model
+    features_cache = {}
 
-    # Here we assume NaNs in sea_ice_cover are the superset those in SST.
-    sea_ice_fraction = self.sea_ice_features(inputs)['sea_ice_cover']
-    land_mask = jnp.isnan(sea_ice_fraction)
-    land_fraction = jnp.maximum(
-        self.land_sea_mask_features(inputs)['land_sea_mask'],
-        (land_mask),
-    )
+    def embed(embedding: MaskedEmbedding) -> typing.Pytree:
+      # only embeddings of the same class are assumed to compute features
+      # identically, since subclasses may override _get_sharded_features.
+      key = (type(embedding), id(embedding.feature_module), id(embedding.mesh))
+      if key not in features_cache:
+        features_cache[key] = embedding.compute_features(inputs)
+      return embedding.apply_to_features(features_cache[key], land_mask)
 
-    land_outputs = self.land_embedding(inputs, land_mask)
-    sea_outputs = self.sea_embedding(inputs, land_mask)
-    sea_ice_outputs = self.sea_ice_embedding(inputs, land_mask)
+    land_outputs = embed(self.land_embedding)
+    sea_outputs = embed(self.sea_embedding)
+    sea_ice_outputs = embed(self.sea_ice_embedding)
 
     sea_fraction = 1 - land_fraction
     # weight and combine outputs
@@ -332,15 +397,11 @@ class LandSeaIceEmbedding(nnx.Module):
     sea_ice_weight = sea_ice_fraction * sea_fraction  # ice covered sea
     sea_weight = (1 - sea_ice_fraction) * sea_fraction  # sea without ice
 
-    def tree_scale(a, x):
-      # Multiply leaves of `x` by `a`.
-      return jax.tree.map(lambda y: a * y, x)
+    def weighted_sum(land, sea, sea_ice):
+      return land_weight * land + sea_weight * sea + sea_ice_weight * sea_ice
 
     outputs = jax.tree.map(
-        lambda a, b, c: a + b + c,
-        tree_scale(land_weight, land_outputs),
-        tree_scale(sea_weight, sea_outputs),
-        tree_scale(sea_ice_weight, sea_ice_outputs),
+        weighted_sum, land_outputs, sea_outputs, sea_ice_outputs
     )
     return self.transform(outputs)
 
@@ -369,11 +430,10 @@ class CoordsStateMapping(nnx.Module):
       mesh: parallelism.Mesh,
       rngs: nnx.Rngs,
   ):
-    output_shapes = {}
-    for name in volume_field_names:
-      output_shapes[name] = typing.ShapeFloatStruct(coords.shape)
-    for name in surface_field_names:
-      output_shapes[name] = typing.ShapeFloatStruct(coords.horizontal.shape)
+    volume_shape = typing.ShapeFloatStruct(coords.shape)
+    surface_shape = typing.ShapeFloatStruct(coords.horizontal.shape)
+    output_shapes = {name: volume_shape for name in volume_field_names}
+    output_shapes.update({name: surface_shape for name in surface_field_names})
     self.coords = coords
     self.embedding = embedding_factory(output_shapes, rngs=rngs)
     self.transform = transform
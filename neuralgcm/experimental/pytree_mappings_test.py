@@ -15,12 +15,14 @@
 """Tests that pytree mappings produce outputs with expected shapes."""
 
 import functools
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
 import chex
 from flax import nnx
 import jax
+import jax.numpy as jnp
 from neuralgcm.experimental import pytree_mappings
 from neuralgcm.experimental import pytree_transforms
 from neuralgcm.experimental import towers
@@ -32,6 +34,33 @@ from neuralgcm.experimental.core import typing
 import numpy as np
 
 
+class ChannelMixingTower(nnx.Module):
+  """Test tower that linearly mixes the leading channel axis of inputs."""
+
+  def __init__(self, input_size: int, output_size: int, *, rngs: nnx.Rngs):
+    self.kernel = nnx.Param(
+        jax.random.normal(rngs.params(), (output_size, input_size))
+    )
+
+  def __call__(self, inputs: jax.Array) -> jax.Array:
+    return jnp.einsum('oi,i...->o...', self.kernel.value, inputs)
+
+
+class DropLeadingAxisTower(ChannelMixingTower):
+  """Test tower that returns outputs with one fewer dimension than expected."""
+
+  def __call__(self, inputs: jax.Array) -> jax.Array:
+    return super().__call__(inputs)[0]
+
+
+class ScaledFeaturesEmbedding(pytree_mappings.MaskedEmbedding):
+  """Test embedding that overrides how sharded features are computed."""
+
+  def _get_sharded_features(self, inputs: typing.Pytree) -> typing.Pytree:
+    features = super()._get_sharded_features(inputs)
+    return jax.tree.map(lambda x: 2 * x, features)
+
+
 class EmbeddingsTest(parameterized.TestCase):
   """Tests embedding modules."""
 
@@ -117,6 +146,133 @@ class EmbeddingsTest(parameterized.TestCase):
     all_leaves_are_no_nans = all(jax.tree_util.tree_leaves(no_nans_tree))
     self.assertTrue(all_leaves_are_no_nans, 'Outputs should not contain NaNs.')
 
+  def test_land_sea_ice_embedding(self):
+    """Checks that LandSeaIceEmbedding combines embeddings by surface type."""
+    rng = np.random.default_rng(0)
+    horizontal_shape = self.coords.horizontal.shape
+    sea_ice_cover = rng.uniform(size=horizontal_shape)
+    sea_ice_cover[rng.uniform(size=horizontal_shape) < 0.3] = np.nan  # land.
+    test_inputs = {
+        'u': rng.normal(size=self.coords.shape),
+        'land_sea_mask': rng.uniform(size=horizontal_shape),
+        'sea_ice_cover': sea_ice_cover,
+    }
+    is_land = np.isnan(sea_ice_cover)
+    input_state_shapes = pytree_utils.shape_structure(test_inputs)
+    embedding_factory = functools.partial(
+        pytree_mappings.MaskedEmbedding,
+        feature_module=pytree_transforms.PrognosticFeatures(('u',)),
+        mapping_factory=self.mapping_factory,
+        input_state_shapes=input_state_shapes,
+        mesh=parallelism.Mesh(None),
+    )
+    embedding = pytree_mappings.LandSeaIceEmbedding(
+        output_shapes=self.output_shapes,
+        sea_embedding_factory=embedding_factory,
+        land_embedding_factory=embedding_factory,
+        sea_ice_embedding_factory=embedding_factory,
+        land_sea_mask_features=pytree_transforms.FeatureSelector(
+            'land_sea_mask'
+        ),
+        sea_ice_features=pytree_transforms.FeatureSelector('sea_ice_cover'),
+        rngs=nnx.Rngs(0),
+    )
+    self._test_embedding_module(embedding, test_inputs)
+
+    with self.subTest('nan_sea_ice_marks_land'):
+      land_mask, land_fraction, sea_ice_fraction = (
+          embedding.surface_fractions(test_inputs)
+      )
+      np.testing.assert_array_equal(land_mask, is_land)
+      expected_land_fraction = np.maximum(test_inputs['land_sea_mask'], is_land)
+      np.testing.assert_allclose(land_fraction, expected_land_fraction)
+      np.testing.assert_array_equal(land_fraction[is_land], 1.0)
+      np.testing.assert_array_equal(sea_ice_fraction, sea_ice_cover)  # NaNs.
+
+    with self.subTest('land_mask_passed_to_embeddings'):
+      apply_fn = pytree_mappings.MaskedEmbedding.apply_to_features
+      with mock.patch.object(
+          pytree_mappings.MaskedEmbedding, 'apply_to_features',
+          autospec=True, side_effect=apply_fn,
+      ) as apply_to_features:
+        embedding(test_inputs)
+      self.assertEqual(apply_to_features.call_count, 3)
+      for call in apply_to_features.call_args_list:
+        np.testing.assert_array_equal(call.args[2], is_land)
+
+    with self.subTest('weighted_sum_of_embeddings'):
+      land = np.where(is_land, 1.0, test_inputs['land_sea_mask'])
+      sea_ice = test_inputs['sea_ice_cover']
+      land_outputs = embedding.land_embedding(test_inputs)
+      sea_outputs = embedding.sea_embedding(test_inputs)
+      sea_ice_outputs = embedding.sea_ice_embedding(test_inputs)
+      expected = jax.tree.map(
+          lambda l, s, i: (
+              land * l + (1 - sea_ice) * (1 - land) * s
+              + sea_ice * (1 - land) * i
+          ),
+          land_outputs,
+          sea_outputs,
+          sea_ice_outputs,
+      )
+      # sea ice terms are NaN over land, so compare with NaNs treated equal.
+      jax.tree.map(
+          functools.partial(
+              np.testing.assert_allclose, rtol=1e-5, atol=1e-6, equal_nan=True
+          ),
+          embedding(test_inputs),
+          expected,
+      )
+
+    with self.subTest('shared_features_computed_once'):
+      features_cls = pytree_transforms.PrognosticFeatures
+      with mock.patch.object(
+          features_cls, '__call__', autospec=True,
+          side_effect=features_cls.__call__,
+      ) as features_call:
+        embedding(test_inputs)
+      self.assertEqual(features_call.call_count, 1)
+
+    with self.subTest('subclass_features_computed_separately'):
+      mixed_embedding = pytree_mappings.LandSeaIceEmbedding(
+          output_shapes=self.output_shapes,
+          sea_embedding_factory=embedding_factory,
+          land_embedding_factory=functools.partial(
+              ScaledFeaturesEmbedding, **embedding_factory.keywords
+          ),
+          sea_ice_embedding_factory=embedding_factory,
+          land_sea_mask_features=pytree_transforms.FeatureSelector(
+              'land_sea_mask'
+          ),
+          sea_ice_features=pytree_transforms.FeatureSelector('sea_ice_cover'),
+          rngs=nnx.Rngs(0),
+      )
+      features_cls = pytree_transforms.PrognosticFeatures
+      apply_fn = pytree_mappings.MaskedEmbedding.apply_to_features
+      with (
+          mock.patch.object(
+              features_cls, '__call__', autospec=True,
+              side_effect=features_cls.__call__,
+          ) as features_call,
+          mock.patch.object(
+              pytree_mappings.MaskedEmbedding, 'apply_to_features',
+              autospec=True, side_effect=apply_fn,
+          ) as apply_to_features,
+      ):
+        mixed_embedding(test_inputs)
+      self.assertEqual(features_call.call_count, 2)
+      features_by_embedding = {
+          id(call.args[0]): call.args[1]
+          for call in apply_to_features.call_args_list
+      }
+      chex.assert_trees_all_close(
+          features_by_embedding[id(mixed_embedding.land_embedding)],
+          jax.tree.map(
+              lambda x: 2 * x,
+              features_by_embedding[id(mixed_embedding.sea_embedding)],
+          ),
+      )
+
   def test_coordinate_state_mapping(self):
     """Checks that CoordsStateMapping produces outputs with expected shapes."""
     input_names = ('u', 'v')
@@ -184,6 +340,148 @@ class ChannelMappingTest(parameterized.TestCase):
     actual = mapping(inputs)
     chex.assert_trees_all_equal_shapes(actual, output_shapes)
 
+  def test_raises_on_tower_output_rank_at_construction(self):
+    """Checks that ChannelMapping validates tower output rank in __init__."""
+    grid = coordinates.LonLatGrid.T21()
+    input_shapes = {'a': typing.ShapeFloatStruct((3,) + grid.shape)}
+    output_shapes = {'b': typing.ShapeFloatStruct((2,) + grid.shape)}
+    with self.assertRaisesRegex(ValueError, 'tower outputs with ndim=3'):
+      pytree_mappings.ChannelMapping(
+          input_shapes=input_shapes,
+          output_shapes=output_shapes,
+          tower_factory=DropLeadingAxisTower,
+          rngs=nnx.Rngs(0),
+      )
+
+
+class VariableMappingTest(parameterized.TestCase):
+  """Tests VariableMapping."""
+
+  def setUp(self):
+    super().setUp()
+    self.coords = coordinates.DinosaurCoordinates(
+        horizontal=coordinates.LonLatGrid.T21(),
+        vertical=coordinates.SigmaLevels.equidistant(4),
+    )
+
+  def test_variable_mapping(self):
+    """Checks that VariableMapping produces outputs with expected shapes."""
+    rng = np.random.default_rng(0)
+    inputs = {k: rng.normal(size=self.coords.shape) for k in ('a', 'b', 'c')}
+    input_shapes = pytree_utils.shape_structure(inputs)
+    output_shapes = {
+        'x': typing.ShapeFloatStruct(self.coords.shape),
+        'y': typing.ShapeFloatStruct(self.coords.shape),
+    }
+    mapping = pytree_mappings.VariableMapping(
+        input_shapes=input_shapes,
+        output_shapes=output_shapes,
+        tower_factory=ChannelMixingTower,
+        rngs=nnx.Rngs(0),
+    )
+    actual = mapping(inputs)
+    chex.assert_trees_all_equal_shapes(actual, output_shapes)
+    chex.assert_trees_all_equal(
+        pytree_utils.shape_structure(actual), mapping.output_shapes
+    )
+
+  def test_raises_on_tower_output_rank_at_construction(self):
+    """Checks that VariableMapping validates tower output rank in __init__."""
+    input_shapes = {'a': typing.ShapeFloatStruct(self.coords.shape)}
+    output_shapes = {'x': typing.ShapeFloatStruct(self.coords.shape)}
+    with self.assertRaisesRegex(ValueError, 'tower outputs with ndim=4'):
+      pytree_mappings.VariableMapping(
+          input_shapes=input_shapes,
+          output_shapes=output_shapes,
+          tower_factory=DropLeadingAxisTower,
+          rngs=nnx.Rngs(0),
+      )
+
+
+class MappingWithNormalizedInputsTest(parameterized.TestCase):
+  """Tests MappingWithNormalizedInputs."""
+
+  def test_mapping_with_normalized_inputs(self):
+    """Checks that inputs of mixed rank are normalized and mapped."""
+    coords = coordinates.DinosaurCoordinates(
+        horizontal=coordinates.LonLatGrid.T21(),
+        vertical=coordinates.SigmaLevels.equidistant(4),
+    )
+    tower_factory = functools.partial(
+        towers.ColumnTower,
+        column_net_factory=functools.partial(
+            standard_layers.MlpUniform, hidden_size=6, n_hidden_layers=2
+        ),
+    )
+    rng = np.random.default_rng(0)
+    inputs = {
+        'full': rng.normal(size=coords.shape),
+        'surface': rng.normal(size=coords.horizontal.shape),
+    }
+    input_shapes = pytree_utils.shape_structure(inputs)
+    output_shapes = {
+        'out_full': typing.ShapeFloatStruct(coords.shape),
+        'out_surface': typing.ShapeFloatStruct(coords.horizontal.shape),
+    }
+    mapping = pytree_mappings.MappingWithNormalizedInputs(
+        input_shapes=input_shapes,
+        output_shapes=output_shapes,
+        mapping_factory=functools.partial(
+            pytree_mappings.ChannelMapping, tower_factory=tower_factory
+        ),
+        normalization_factory=(
+            pytree_transforms.BatchShiftAndNormalize.for_input_shapes
+        ),
+        rngs=nnx.Rngs(0),
+    )
+    actual = mapping(inputs)
+    chex.assert_trees_all_equal_shapes(actual, output_shapes)
+    chex.assert_tree_all_finite(actual)
+
+    with self.subTest('raises_on_rank_mismatch'):
+      surface_3d = rng.normal(size=(1,) + coords.horizontal.shape)
+      with self.assertRaisesRegex(ValueError, 'Expected input with ndim=2'):
+        mapping(inputs | {'surface': surface_3d})
+
+
+class ParallelMappingTest(parameterized.TestCase):
+  """Tests ParallelMapping."""
+
+  def test_parallel_mapping_sums_outputs(self):
+    """Checks that ParallelMapping adds outputs of all mappings."""
+    grid = coordinates.LonLatGrid.T21()
+    tower_factory = functools.partial(
+        towers.ColumnTower,
+        column_net_factory=functools.partial(
+            standard_layers.MlpUniform, hidden_size=6, n_hidden_layers=2
+        ),
+    )
+    inputs = {
+        'a': np.ones((3,) + grid.shape),
+        'b': np.ones(grid.shape),
+    }
+    input_shapes = pytree_utils.shape_structure(inputs)
+    output_shapes = {
+        'x': typing.ShapeFloatStruct((2,) + grid.shape),
+        'y': typing.ShapeFloatStruct(grid.shape),
+    }
+    mappings = [
+        pytree_mappings.ChannelMapping(
+            input_shapes=input_shapes,
+            output_shapes=output_shapes,
+            tower_factory=tower_factory,
+            rngs=nnx.Rngs(seed),
+        )
+        for seed in range(3)
+    ]
+    parallel_mapping = pytree_mappings.ParallelMapping(mappings)
+    actual = parallel_mapping(inputs)
+    expected = jax.tree.map(
+        lambda *xs: sum(xs), *[mapping(inputs) for mapping in mappings]
+    )
+    chex.assert_trees_all_close(actual, expected, rtol=1e-6)
+    chex.assert_trees_all_equal_shapes(actual, parallel_mapping.output_shapes)
+
 
 if __name__ == '__main__':
   jax.config.parse_flags_with_absl()
@@ -42,6 +42,60 @@ import numpy as np
 import xarray
 
 
+# Shared across tests so that compiled executables are reused between cases.
+_jit_apply = nnx.jit(lambda module, inputs: module(inputs))
+
+
+# Shared T21 transform and derived grid data; read-only in all tests.
+_YLM_T21 = spherical_transforms.SphericalHarmonicsTransform(
+    lon_lat_grid=coordinates.LonLatGrid.T21(),
+    ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
+    partition_schema_key=None,
+    mesh=parallelism.Mesh(),
+)
+_T21_TOTAL_WAVENUMBERS = np.asarray(
+    _YLM_T21.ylm_grid.fields['total_wavenumber'].data
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _mask_test_pattern(shape: tuple[int, ...]) -> np.ndarray:
+  """Returns a cached, read-only array with values cycling over [0, 0.9]."""
+  pattern = ((np.arange(np.prod(shape)) % 10) / 10).reshape(shape)
+  pattern.setflags(write=False)
+  return pattern
+
+
+@functools.lru_cache(maxsize=1)
+def _dynamic_trajectory_data():
+  """Returns cached trajectory data for DynamicInputSlice tests.
+
+  The returned pytree is shared between callers and must not be modified.
+  """
+  grid = _YLM_T21.lon_lat_grid
+  expand_dims = lambda x: np.expand_dims(x, axis=(1, 2))
+  data = {
+      'abc': {
+          'a': expand_dims(np.arange(2)) * np.ones(grid.shape),
+          'b': expand_dims(np.arange(2)) * np.zeros(grid.shape),
+          'c': expand_dims(np.arange(2)) * np.ones(grid.shape),
+      }
+  }
+  timedelta = coordinates.TimeDelta(np.arange(2, dtype='timedelta64[h]'))
+  grid_trajectory = cx.compose_coordinates(timedelta, grid)
+  time = jdt.to_datetime('2000-01-01') + jdt.to_timedelta(
+      12, 'h'
+  ) * np.arange(timedelta.shape[0])
+  in_data = jax.tree.map(lambda x: cx.wrap(x, grid_trajectory), data)
+  in_data['abc']['time'] = cx.wrap(time, timedelta)
+  return in_data
+
+
+def _ones(shape: tuple[int, ...]) -> np.ndarray:
+  """Returns a read-only array of ones backed by a single scalar."""
+  return np.broadcast_to(np.array(1.0), shape)
+
+
 class StandardPytreeTransformsTest(parameterized.TestCase):
   """Tests for standard_layers.MaskTransform and Composed.ConvLonLat."""
 
@@ -82,50 +136,14 @@ class StandardPytreeTransformsTest(parameterized.TestCase):
     else:
       nan_threshold = False
       threshold = fill_threshold
-    data = {
-        'u': ((np.arange(np.prod(mask_shape)) % 10) / 10).reshape(mask_shape),
-        'v': ((np.arange(np.prod(mask_shape)) % 10) / 10).reshape(mask_shape),
-        'T': ((np.arange(np.prod(mask_shape)) % 10) / 10).reshape(mask_shape),
-    }
-    expected = {
-        k: (
-            np.where(v > threshold, fill_value_true, fill_value_false)
-            if k in fields_to_mask
-            else v
-        )
-        for k, v in data.items()
-    }
+    base = _mask_test_pattern(mask_shape)
+    data = dict.fromkeys(('u', 'v', 'T'), base)  # read-only, safe to alias.
+    masked = np.where(base > threshold, fill_value_true, fill_value_false)
+    expected = {k: masked if k in fields_to_mask else base for k in data}
     if nan_threshold:
-      inputs = {k: np.where(v > threshold, np.nan, v) for k, v in data.items()}
+      inputs = dict.fromkeys(data, np.where(base > threshold, np.nan, base))
     else:
       inputs = data
-    if len(mask_shape) == 2:
-      xarray_test = xarray.Dataset(
-          data_vars=dict(
-              u=(['longitude', 'latitude'], inputs['u']),
-              v=(['longitude', 'latitude'], inputs['v']),
-              T=(['longitude', 'latitude'], inputs['T']),
-          ),
-          coords=dict(
-              longitude=('longitude', np.arange(mask_shape[-2])),
-              latitude=('latitude', np.arange(mask_shape[-1])),
-          ),
-      )
-    elif len(mask_shape) == 3:
-      xarray_test = xarray.Dataset(
-          data_vars=dict(
-              u=(['longitude', 'latitude', 'level'], inputs['u']),
-              v=(['longitude', 'latitude', 'level'], inputs['v']),
-              T=(['longitude', 'latitude', 'level'], inputs['T']),
-          ),
-          coords=dict(
-              longitude=('longitude', np.arange(mask_shape[-3])),
-              latitude=('latitude', np.arange(mask_shape[-2])),
-              level=('level', np.arange(mask_shape[-1])),
-          ),
-      )
-    else:
-      raise ValueError(f'Expected mask_shape of length 2 or 3. {mask_shape=}')
     mask_transform = pytree_transforms.MaskTransform(
         fields_to_mask=fields_to_mask,
         mask_shape=mask_shape,
@@ -135,18 +153,45 @@ class StandardPytreeTransformsTest(parameterized.TestCase):
     )
 
     with self.subTest('gen_mask_from_xarray'):
+      if len(mask_shape) == 2:
+        xarray_test = xarray.Dataset(
+            data_vars=dict(
+                u=(['longitude', 'latitude'], inputs['u']),
+                v=(['longitude', 'latitude'], inputs['v']),
+                T=(['longitude', 'latitude'], inputs['T']),
+            ),
+            coords=dict(
+                longitude=('longitude', np.arange(mask_shape[-2])),
+                latitude=('latitude', np.arange(mask_shape[-1])),
+            ),
+        )
+      elif len(mask_shape) == 3:
+        xarray_test = xarray.Dataset(
+            data_vars=dict(
+                u=(['longitude', 'latitude', 'level'], inputs['u']),
+                v=(['longitude', 'latitude', 'level'], inputs['v']),
+                T=(['longitude', 'latitude', 'level'], inputs['T']),
+            ),
+            coords=dict(
+                longitude=('longitude', np.arange(mask_shape[-3])),
+                latitude=('latitude', np.arange(mask_shape[-2])),
+                level=('level', np.arange(mask_shape[-1])),
+            ),
+        )
+      else:
+        raise ValueError(f'Expected mask_shape of length 2 or 3. {mask_shape=}')
       mask_transform.update_from_xarray(xarray_test, fields_to_mask[0])
       np.testing.assert_allclose(
           mask_transform.mask.value, expected[fields_to_mask[0]]
       )
 
     test_data = {
-        'u': np.ones(mask_shape),
-        'v': np.ones(mask_shape),
-        'T': np.ones(mask_shape),
+        'u': _ones(mask_shape),
+        'v': _ones(mask_shape),
+        'T': _ones(mask_shape),
     }
     with self.subTest('check_mask_applies_to_correct_variables'):
-      outputs = mask_transform(test_data)
+      outputs = _jit_apply(mask_transform, test_data)
       for i in set(['u', 'v', 'T']) - set(fields_to_mask):
         np.testing.assert_allclose(outputs[i], np.ones(mask_shape))
       for i in fields_to_mask:
@@ -186,12 +231,12 @@ class StandardPytreeTransformsTest(parameterized.TestCase):
   )
   def test_clip_wavenumbers(self, n_clip: int = 1):
     """Tests that ClipWavenumbers works as expected."""
-    grid = coordinates.SphericalHarmonicGrid.T21()
+    grid = _YLM_T21.ylm_grid
     inputs = {
-        'u': np.ones(grid.shape),
-        'v': np.ones(grid.shape),
+        'u': _ones(grid.shape),
+        'v': _ones(grid.shape),
     }
-    ls = grid.fields['total_wavenumber'].data
+    ls = _T21_TOTAL_WAVENUMBERS
     clip_mask = (np.arange(ls.size) <= (ls.max() - n_clip)).astype(int)
     expected = jax.tree.map(lambda x: x * clip_mask, inputs)
     clip_transform = pytree_transforms.ClipWavenumbers(
@@ -221,17 +266,20 @@ class StandardPytreeTransformsTest(parameterized.TestCase):
     xs = get_inputs(jax.random.key(1))
 
     def _check_mean_and_std(xs, expected_means, expected_stds):
-      mean_over_batch = functools.partial(np.mean, axis=0)
-      std_over_batch = functools.partial(np.std, axis=0)
-      xs_mean = jax.tree.map(mean_over_batch, xs)
-      xs_std = jax.tree.map(std_over_batch, xs)
-      for i, k in enumerate(keys):
-        mean_atol = 6 * (expected_stds[i] / np.sqrt(batch_size))
-        std_atol = 6 * (np.sqrt(2 / (batch_size - 1)) * expected_stds[i] ** 2)
-        expected_mean = np.array([expected_means[i]] * feature_size)
-        expected_std = np.array([expected_stds[i]] * feature_size)
-        np.testing.assert_allclose(xs_mean[k], expected_mean, atol=mean_atol)
-        np.testing.assert_allclose(xs_std[k], expected_std, atol=std_atol)
+      stacked = np.stack([np.asarray(xs[k]) for k in keys])  # [key, batch, f]
+      xs_mean = stacked.mean(axis=1)
+      xs_std = stacked.std(axis=1)
+      stds = np.asarray(expected_stds)
+      mean_atols = 6 * stds / np.sqrt(batch_size)
+      std_atols = 6 * np.sqrt(2 / (batch_size - 1)) * stds**2
+      for i in range(len(keys)):
+        # Scalar expectations broadcast against the [feature] statistics.
+        np.testing.assert_allclose(
+            xs_mean[i], expected_means[i], atol=mean_atols[i]
+        )
+        np.testing.assert_allclose(
+            xs_std[i], expected_stds[i], atol=std_atols[i]
+        )
 
     with self.subTest('input_mean_and_std'):
       _check_mean_and_std(xs, input_means, input_stds)
@@ -243,21 +291,30 @@ class StandardPytreeTransformsTest(parameterized.TestCase):
         use_running_average=True,
     )
     with self.subTest('identity_at_init'):
-      ys = batch_shift_and_normalize(xs)
+      ys = _jit_apply(batch_shift_and_normalize, xs)
       _check_mean_and_std(ys, input_means, input_stds)
 
     zero_means = tuple(0.0 for _ in input_means)
     unit_stds = tuple(1.0 for _ in input_stds)
     with self.subTest('zero_mean_unit_variance_when_dynamic'):
       batch_shift_and_normalize.use_running_average = False
-      ys = batch_shift_and_normalize(xs)
+      ys = _jit_apply(batch_shift_and_normalize, xs)
       _check_mean_and_std(ys, zero_means, unit_stds)
 
     with self.subTest('converges_to_zero_mean_unit_variance'):
-      for _ in range(20):  # EMA converges with remaining init bias ~0.1**20.
-        _ = batch_shift_and_normalize(xs)
+
+      @nnx.jit
+      def update_batch_stats(module, inputs):
+        def step(_, module):
+          module(inputs)
+          return module
+
+        # EMA converges with remaining init bias ~0.1**20.
+        nnx.fori_loop(0, 20, step, module)
+
+      update_batch_stats(batch_shift_and_normalize, xs)
       batch_shift_and_normalize.use_running_average = True
-      ys = batch_shift_and_normalize(xs)
+      ys = _jit_apply(batch_shift_and_normalize, xs)
       _check_mean_and_std(ys, zero_means, unit_stds)
 
   @parameterized.named_parameters(
@@ -327,17 +384,12 @@ class InputsFeaturesTest(parameterized.TestCase):
     )
 
   def test_latitude_features(self):
-    grid = coordinates.LonLatGrid.T21()
+    grid = _YLM_T21.lon_lat_grid
     latitude_features = pytree_transforms.LatitudeFeatures(grid=grid)
     self._test_feature_module(latitude_features, None)
 
   def test_orography_features(self):
-    ylm_transform = spherical_transforms.SphericalHarmonicsTransform(
-        lon_lat_grid=coordinates.LonLatGrid.T21(),
-        ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
-        partition_schema_key=None,
-        mesh=parallelism.Mesh(),
-    )
+    ylm_transform = _YLM_T21
     orography = orographies.ModalOrography(
         ylm_transform=ylm_transform,
         rngs=None,
@@ -348,12 +400,7 @@ class InputsFeaturesTest(parameterized.TestCase):
     self._test_feature_module(orography_features, None)
 
   def test_orography_with_grads_features(self):
-    ylm_transform = spherical_transforms.SphericalHarmonicsTransform(
-        lon_lat_grid=coordinates.LonLatGrid.T21(),
-        ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
-        partition_schema_key=None,
-        mesh=parallelism.Mesh(),
-    )
+    ylm_transform = _YLM_T21
     orography = orographies.ModalOrography(
         ylm_transform=ylm_transform,
         rngs=None,
@@ -367,27 +414,17 @@ class InputsFeaturesTest(parameterized.TestCase):
     )
     self._test_feature_module(orography_features, None)
 
-  def test_dynamic_input_features(self):
-    grid = coordinates.LonLatGrid.T21()
+  def _make_dynamic_inputs(self):
+    """Returns a DynamicInputSlice and trajectory data to update it with."""
+    grid = _YLM_T21.lon_lat_grid
     dynamic_input = dynamic_io.DynamicInputSlice(
         keys_to_coords={'a': grid, 'b': grid, 'c': grid},
         observation_key='abc',
     )
-    expand_dims = lambda x: np.expand_dims(x, axis=(1, 2))
-    data = {
-        'abc': {
-            'a': expand_dims(np.arange(2)) * np.ones(grid.shape),
-            'b': expand_dims(np.arange(2)) * np.zeros(grid.shape),
-            'c': expand_dims(np.arange(2)) * np.ones(grid.shape),
-        }
-    }
-    timedelta = coordinates.TimeDelta(np.arange(2, dtype='timedelta64[h]'))
-    grid_trajectory = cx.compose_coordinates(timedelta, grid)
-    time = jdt.to_datetime('2000-01-01') + jdt.to_timedelta(
-        12, 'h'
-    ) * np.arange(timedelta.shape[0])
-    in_data = jax.tree.map(lambda x: cx.wrap(x, grid_trajectory), data)
-    in_data['abc']['time'] = cx.wrap(time, timedelta)
+    return dynamic_input, _dynamic_trajectory_data()
+
+  def test_dynamic_input_features(self):
+    dynamic_input, in_data = self._make_dynamic_inputs()
     dynamic_input.update_dynamic_inputs(in_data)
     with self.subTest('two_keys'):
       dynamic_input_features = pytree_transforms.DynamicInputFeatures(
@@ -399,26 +436,7 @@ class InputsFeaturesTest(parameterized.TestCase):
       )
 
   def test_dynamic_input_features_inder_jit(self):
-    grid = coordinates.LonLatGrid.T21()
-    dynamic_input = dynamic_io.DynamicInputSlice(
-        keys_to_coords={'a': grid, 'b': grid, 'c': grid},
-        observation_key='abc',
-    )
-    expand_dims = lambda x: np.expand_dims(x, axis=(1, 2))
-    data = {
-        'abc': {
-            'a': expand_dims(np.arange(2)) * np.ones(grid.shape),
-            'b': expand_dims(np.arange(2)) * np.zeros(grid.shape),
-            'c': expand_dims(np.arange(2)) * np.ones(grid.shape),
-        }
-    }
-    timedelta = coordinates.TimeDelta(np.arange(2, dtype='timedelta64[h]'))
-    grid_trajectory = cx.compose_coordinates(timedelta, grid)
-    time = jdt.to_datetime('2000-01-01') + jdt.to_timedelta(
-        12, 'h'
-    ) * np.arange(timedelta.shape[0])
-    in_data = jax.tree.map(lambda x: cx.wrap(x, grid_trajectory), data)
-    in_data['abc']['time'] = cx.wrap(time, timedelta)
+    dynamic_input, in_data = self._make_dynamic_inputs()
 
     @nnx.jit
     def run(module, inputs, dynamic_inputs):
@@ -438,7 +456,7 @@ class InputsFeaturesTest(parameterized.TestCase):
     feature_sizes = {
         'learned_surface_features': 8,
     }
-    grid = coordinates.LonLatGrid.T21()
+    grid = _YLM_T21.lon_lat_grid
     static_surface_features = pytree_transforms.SpatialSurfaceFeatures(
         feature_sizes, grid=grid, rngs=nnx.Rngs(1)
     )
@@ -446,12 +464,7 @@ class InputsFeaturesTest(parameterized.TestCase):
 
   def test_velocity_and_prognostics_with_modal_gradients(self):
     sigma = coordinates.SigmaLevels.equidistant(4)
-    ylm_transform = spherical_transforms.SphericalHarmonicsTransform(
-        lon_lat_grid=coordinates.LonLatGrid.T21(),
-        ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
-        partition_schema_key=None,
-        mesh=parallelism.Mesh(),
-    )
+    ylm_transform = _YLM_T21
     with_gradients_transform = pytree_transforms.ToModalWithFilteredGradients(
         ylm_transform,
         filter_attenuations=[2.0],
@@ -467,18 +480,18 @@ class InputsFeaturesTest(parameterized.TestCase):
         compute_gradients_transform=with_gradients_transform,
     )
     inputs = {
-        'u': np.ones(sigma.shape + ylm_transform.modal_grid.shape),
-        'v': np.ones(sigma.shape + ylm_transform.modal_grid.shape),
-        'vorticity': np.ones(sigma.shape + ylm_transform.modal_grid.shape),
-        'divergence': np.ones(sigma.shape + ylm_transform.modal_grid.shape),
-        'lsp': np.ones(ylm_transform.modal_grid.shape),
+        'u': _ones(sigma.shape + ylm_transform.modal_grid.shape),
+        'v': _ones(sigma.shape + ylm_transform.modal_grid.shape),
+        'vorticity': _ones(sigma.shape + ylm_transform.modal_grid.shape),
+        'divergence': _ones(sigma.shape + ylm_transform.modal_grid.shape),
+        'lsp': _ones(ylm_transform.modal_grid.shape),
         'tracers': {},
         'time': jdt.to_datetime('2025-01-09T15:00'),
     }
     self._test_feature_module(features_grads, inputs)
 
   def test_surface_embedding_features(self):
-    grid = coordinates.LonLatGrid.T21()
+    grid = _YLM_T21.lon_lat_grid
     mlp_factory = functools.partial(
         standard_layers.MlpUniform, hidden_size=6, n_hidden_layers=2
     )
@@ -509,7 +522,7 @@ class InputsFeaturesTest(parameterized.TestCase):
   def test_volume_embedding_features(self):
     n_levels = 12
     coords = coordinates.DinosaurCoordinates(
-        horizontal=coordinates.LonLatGrid.T21(),
+        horizontal=_YLM_T21.lon_lat_grid,
         vertical=coordinates.LayerLevels(n_levels),
     )
     mlp_factory = functools.partial(
@@ -542,12 +555,7 @@ class InputsFeaturesTest(parameterized.TestCase):
   @parameterized.named_parameters(
       dict(
           testcase_name='T21_grid',
-          ylm_transform=spherical_transforms.SphericalHarmonicsTransform(
-              lon_lat_grid=coordinates.LonLatGrid.T21(),
-              ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
-              partition_schema_key=None,
-              mesh=parallelism.Mesh(None),
-          ),
+          ylm_transform=_YLM_T21,
       ),
   )
   def test_randomness_features(self, ylm_transform):
@@ -587,34 +595,29 @@ class InputsFeaturesTest(parameterized.TestCase):
 
   def test_prognostic_features(self):
     coords = coordinates.DinosaurCoordinates(
-        horizontal=coordinates.LonLatGrid.T21(),
+        horizontal=_YLM_T21.lon_lat_grid,
         vertical=coordinates.LayerLevels(n_layers=3),
     )
     prognostic_features = pytree_transforms.PrognosticFeatures(
         prognostic_keys=('a', 'b', 'c')
     )
     inputs = {
-        'a': np.ones(coords.horizontal.shape),
-        'b': np.ones(coords.horizontal.shape),
-        'c': np.ones(coords.shape),
+        'a': _ones(coords.horizontal.shape),
+        'b': _ones(coords.horizontal.shape),
+        'c': _ones(coords.shape),
         'time': jdt.to_datetime('2025-01-09T15:00'),
     }
     self._test_feature_module(prognostic_features, inputs)
 
   def test_pressure_features(self):
     sigma = coordinates.SigmaLevels.equidistant(8)
-    ylm_transform = spherical_transforms.SphericalHarmonicsTransform(
-        lon_lat_grid=coordinates.LonLatGrid.T21(),
-        ylm_grid=coordinates.SphericalHarmonicGrid.T21(),
-        partition_schema_key=None,
-        mesh=parallelism.Mesh(None),
-    )
+    ylm_transform = _YLM_T21
 
     pressure_features = pytree_transforms.PressureFeatures(
         ylm_transform=ylm_transform, sigma=sigma,
     )
     inputs = {
-        'log_surface_pressure': np.ones(ylm_transform.modal_grid.shape),
+        'log_surface_pressure': _ones(ylm_transform.modal_grid.shape),
     }
     self._test_feature_module(pressure_features, inputs)
 